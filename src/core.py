@@ -1,16 +1,93 @@
 # src/core.py
+import atexit
+import base64
 import csv
+import email
+import email.policy
+import functools
+import hashlib
+import io
 import os
 import sys
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from gmail_service import get_gmail_service
 from query_builder import build_query
 from profile_manager import load_profile
 from file_handler import save_attachment, save_email_as_eml
+from state_store import open_state_db, compact_state_db, ProcessedIndex, SavedAttachments, Downloads
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Threads are fetched with just the headers used by the run; full payloads are only fetched where attachments can be
+METADATA_HEADERS = ['Subject', 'From', 'To', 'Cc']
+
+# Partial-response masks, so Gmail only sends (and the client only parses) the fields the run reads
+THREAD_LIST_FIELDS = 'nextPageToken,threads(id)'
+THREAD_FIELDS = 'messages(id,threadId,internalDate,payload(mimeType,headers))'
+MESSAGE_PARTS_FIELDS = 'id,payload/parts(filename,body(attachmentId,data))'
+
+# Gmail accepts up to 100 calls per batch request but recommends no more than 50 to avoid rate limiting
+BATCH_SIZE = 50
+
+# Minimum time in seconds between progress bar redraws
+PROGRESS_INTERVAL = 0.05
+
+def _may_have_attachments(msg):
+    """Attachments are parts of a multipart message; multipart/alternative only holds the body variants."""
+    mime_type = msg['payload'].get('mimeType', '')
+    return mime_type.startswith('multipart/') and mime_type != 'multipart/alternative'
+
+def _headers(msg):
+    """Returns the message headers as a dict keyed by lowercase header name."""
+    return {h['name'].lower(): h['value'] for h in msg['payload']['headers']}
+
+def _attachment_digest(msg_id, filename):
+    """Identifies an attachment across runs. Gmail attachment IDs change between fetches, so they cannot be used."""
+    return hashlib.blake2b(f"{msg_id}/{filename}".encode('utf-8'), digest_size=16).digest()
+
+def _raw_attachments(raw):
+    """
+    Returns (filename, decoded bytes) for each top-level part of a raw email that carries a filename,
+    matching the parts Gmail lists in payload.parts.
+    """
+    message = email.message_from_bytes(base64.urlsafe_b64decode(raw), policy=email.policy.default)
+    return [
+        (part.get_filename(), part.get_payload(decode=True) or b'')
+        for part in message.iter_parts() if part.get_filename()
+    ]
+
+def _remove_file(file_path):
+    """Deletes a file and returns a (status, details) tuple; status is 'Success', 'Missing' or 'Error'."""
+    try:
+        os.remove(file_path)
+        return 'Success', ''
+    except FileNotFoundError:
+        return 'Missing', ''
+    except OSError as e:
+        return 'Error', str(e)
+
+def _csv_field(value):
+    """Formats a value as a CSV field, quoting it the same way csv.QUOTE_MINIMAL does."""
+    if value is None:
+        return ''
+    value = str(value)
+    if ',' in value or '"' in value or '\n' in value or '\r' in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
 
 class CsvLogger:
     """A logger to write structured, event-based data to a persistent CSV file."""
+    # Rows are collected in memory and written out in blocks, at this size or after this many seconds
+    BUFFER_SIZE = 64 * 1024
+    FLUSH_INTERVAL = 5.0
+
     def __init__(self, filename, fieldnames):
         self.filename = filename
         self.fieldnames = fieldnames
@@ -18,24 +95,79 @@ class CsvLogger:
         os.makedirs(os.path.dirname(self.filename), exist_ok=True)
         file_exists = os.path.isfile(self.filename)
         self.file_handle = open(self.filename, 'a', newline='', encoding='utf-8')
-        self.writer = csv.DictWriter(self.file_handle, fieldnames=self.fieldnames)
         if not file_exists:
-            self.writer.writeheader()
+            csv.DictWriter(self.file_handle, fieldnames=self.fieldnames).writeheader()
+        # Rows are formatted by hand; csv.DictWriter adds a lot of per-row overhead for a fixed schema
+        self._timestamp_index = self.fieldnames.index('Timestamp') if 'Timestamp' in self.fieldnames else None
+        self._buffer = io.StringIO()
+        # Attachment results are logged from the download worker threads
+        self._lock = threading.Lock()
+        self._last_drain = time.monotonic()
+        self._last_second = None
+        self._last_timestamp = ''
+        # Buffered rows must still reach the disk if the run is interrupted
+        atexit.register(self.close)
+
+    def log(self, data_dict, flush=False):
+        """
+        Appends a new row to the CSV log file.
+        Rows are buffered, except for errors or when flush is set, which are written out immediately.
+        """
+        self.log_many((data_dict,), flush)
 
-    def log(self, data_dict):
-        """Appends a new row to the CSV log file."""
-        filtered_data = {k: v for k, v in data_dict.items() if k in self.fieldnames}
-        self.writer.writerow(filtered_data)
+    def log_many(self, rows, flush=False):
+        """Appends several rows at once, taking the lock and writing to the buffer a single time."""
+        lines = []
+        has_error = False
+        with self._lock:
+            for data_dict in rows:
+                values = [data_dict.get(field) for field in self.fieldnames]
+                if self._timestamp_index is not None and not values[self._timestamp_index]:
+                    values[self._timestamp_index] = self._timestamp()
+                lines.append(','.join(map(_csv_field, values)) + '\r\n')
+                has_error = has_error or data_dict.get('Status') == 'Error'
+            if not lines:
+                return
+            self._buffer.write(''.join(lines))
+            if (flush or has_error or self._buffer.tell() >= self.BUFFER_SIZE
+                    or time.monotonic() - self._last_drain >= self.FLUSH_INTERVAL):
+                self._drain()
+
+    def _drain(self):
+        """Writes the buffered rows to the file in a single write and flushes it."""
+        self.file_handle.write(self._buffer.getvalue())
         self.file_handle.flush()
+        self._buffer.seek(0)
+        self._buffer.truncate(0)
+        self._last_drain = time.monotonic()
+
+    def _timestamp(self):
+        """Returns the local time as 'YYYY-MM-DD HH:MM:SS', formatting it at most once per second."""
+        now = int(time.time())
+        if now != self._last_second:
+            lt = time.localtime(now)
+            self._last_timestamp = f"{lt.tm_year:04d}-{lt.tm_mon:02d}-{lt.tm_mday:02d} {lt.tm_hour:02d}:{lt.tm_min:02d}:{lt.tm_sec:02d}"
+            self._last_second = now
+        return self._last_timestamp
 
     def close(self):
-        """Closes the file handle."""
-        self.file_handle.close()
+        """Writes out any buffered rows and closes the file handle."""
+        with self._lock:
+            if self.file_handle.closed:
+                return
+            self._drain()
+            self.file_handle.close()
+        # Once closed, the exit hook has nothing left to do and would only keep the logger alive
+        atexit.unregister(self.close)
 
 class FiscalFetchCore:
     def __init__(self, config):
         self.config = config
-        self.service, self.user_email = get_gmail_service()
+        # Connecting to Gmail is deferred to _ensure_service(), since resets work offline
+        self.service = None
+        self.user_email = None
+        # Attachment downloads are I/O-bound, so they run on a pool of worker threads
+        self.executor = ThreadPoolExecutor(max_workers=self.config.get('workers', 8))
         
         self.output_dir = self.config.get('output_directory', 'fiscal_fetch_output')
         if not os.path.exists(self.output_dir):
@@ -43,7 +175,14 @@ class FiscalFetchCore:
 
         # All logs and indexes are now inside the main output directory
         self.audit_log_path = os.path.join(self.output_dir, "logs", "audit_log.csv")
-        self.index_path = os.path.join(self.output_dir, ".state", "processed_threads.json")
+        self.state_db_path = os.path.join(self.output_dir, ".state", "processed.sqlite3")
+        self._last_progress_time = 0.0
+
+        self.state_db = open_state_db(self.state_db_path)
+        self.processed_index = ProcessedIndex(self.state_db)
+        self.saved_attachments = SavedAttachments(self.state_db)
+        self.downloads = Downloads(self.state_db, self._audit_log_downloads())
+        self._migrate_legacy_index()
 
         self.audit_logger = CsvLogger(
             filename=self.audit_log_path,
@@ -52,7 +191,8 @@ class FiscalFetchCore:
         self.report_logger = None
         # *** FIX IS HERE ***
         # Only set up the report logger if a date_range is provided (i.e., it's a 'run' command)
-        if self.config.get('date_range') and not self.config.get('no_report'):
+        # Dry runs don't write a report, since the report also saves every email as an .eml file
+        if self.config.get('date_range') and not self.config.get('no_report') and not self.config.get('dry_run'):
             run_timestamp = datetime.now().strftime('%Y-%m-%d_%H%M%S')
             date_range_str = self.config.get('date_range').replace(':', '_to_')
             report_filename = f"{run_timestamp}_report_for_{date_range_str}.csv"
@@ -66,22 +206,178 @@ class FiscalFetchCore:
                 ]
             )
 
-    def _load_processed_index(self):
-        """Loads the set of already processed thread IDs from a file."""
+    def _migrate_legacy_index(self):
+        """Older versions kept the index as a JSON list; imports it into the database once."""
+        legacy_json_path = os.path.join(os.path.dirname(self.state_db_path), "processed_threads.json")
+
         try:
-            with open(self.index_path, 'r') as f:
-                return set(json.load(f))
+            with open(legacy_json_path, 'rb') as f:
+                data = f.read()
+            self.processed_index.add(orjson.loads(data) if orjson else json.loads(data))
+            os.remove(legacy_json_path)
         except (FileNotFoundError, json.JSONDecodeError):
-            return set()
+            pass
+
+    def _audit_log_downloads(self):
+        """
+        Yields (thread ID, email date, relative path) for every attachment the audit log records as saved.
+        Older versions only recorded saved files there; this fills the downloads table when it is first created.
+        """
+        try:
+            f = open(self.audit_log_path, 'r', newline='', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            reader = csv.reader(f)
+            # Column positions are looked up once from the header instead of building a dict per row
+            columns = {name: i for i, name in enumerate(next(reader, []))}
+            try:
+                event_col, status_col = columns['Event Type'], columns['Status']
+                thread_col, date_col, details_col = columns['Thread ID'], columns['Email Date'], columns['Details']
+            except KeyError:
+                # An empty or headerless log has nothing to import
+                return
+            last_col = max(event_col, status_col, thread_col, date_col, details_col)
+            for row in reader:
+                # A row cut short by a crash is skipped
+                if len(row) > last_col and row[event_col] == 'Attachment Process' and row[status_col] == 'Saved':
+                    yield row[thread_col], row[date_col], row[details_col]
+
+    def _iter_threads(self, query):
+        """Yields every thread matching the query, following nextPageToken with the largest page size Gmail allows."""
+        page_token = None
+        while True:
+            response = self.service.users().threads().list(
+                userId='me', q=query, maxResults=500, pageToken=page_token, fields=THREAD_LIST_FIELDS
+            ).execute()
+            yield from response.get('threads', [])
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _batch_execute(self, requests):
+        """
+        Executes a dict of {request_id: HttpRequest} through Gmail batch requests.
+        Returns {request_id: response}, with the exception in place of the response for failed calls.
+        """
+        responses = {}
+
+        def _on_response(request_id, response, exception):
+            responses[request_id] = exception if exception is not None else response
+
+        items = list(requests.items())
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=_on_response)
+            for request_id, request in items[start:start + BATCH_SIZE]:
+                batch.add(request, request_id=request_id)
+            batch.execute()
+        return responses
+
+    def _fetch_and_save(self, msg_id, attachment_id, filename, email_date, date_prefix):
+        """Downloads a single attachment and saves it to disk. Runs on a worker thread."""
+        attachment_data = self.service.users().messages().attachments().get(
+            userId='me', messageId=msg_id, id=attachment_id
+        ).execute()
+        return save_attachment(filename, attachment_data['data'], self.output_dir, email_date, date_prefix=date_prefix)
+
+    def _attachment_task(self, save, thread_id, filename, date_prefix, subject, digest, failed_thread_ids):
+        """
+        Saves one attachment and logs the result. Runs on a worker thread.
+        The bookkeeping happens inside the task rather than in a done-callback, since wait() can return
+        before a future's callbacks have run.
+        """
+        try:
+            result = save()
+        except Exception as e:
+            result = {'status': 'Error', 'details': str(e)}
+            failed_thread_ids.add(thread_id)
+
+        # Recorded as soon as the file is on disk, so an interrupted run can still be reset
+        if result.get('path'):
+            self.downloads.add([(thread_id, date_prefix, result['path'])])
+            self.saved_attachments.add([(digest, thread_id, result['path'])])
+
+        self.audit_logger.log({
+            'Event Type': "Attachment Process", 
+            'Thread ID': thread_id, 
+            'Email Date': date_prefix,
+            'Subject': subject, 
+            'Entity': filename, 
+            'Status': result['status'], 
+            'Details': result['details']
+        })
 
-    def _save_processed_index(self, processed_ids):
-        """Saves the updated set of processed thread IDs to a file."""
-        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-        with open(self.index_path, 'w') as f:
-            json.dump(list(processed_ids), f)
+    def _already_saved(self, digest):
+        """True if an earlier run saved this attachment and its file is still on disk, so deleted files are fetched again."""
+        saved_path = self.saved_attachments.path_of(digest)
+        return bool(saved_path) and os.path.exists(os.path.join(self.output_dir, saved_path))
+
+    def _report_task(self, report_row, thread_id, msg_id, email_date, date_prefix, subject, failed_thread_ids):
+        """
+        Downloads one raw email, saves it as .eml and saves the attachments it carries. Runs on a worker thread.
+        The raw email already contains every attachment, so with a report on they are taken from it
+        instead of being fetched a second time. Returns the report row, which _finish_chunk writes in message order.
+        """
+        try:
+            raw = self.service.users().messages().get(userId='me', id=msg_id, format='raw', fields='raw').execute()['raw']
+        except Exception as e:
+            self.audit_logger.log({'Event Type': "Message Fetch", 'Thread ID': thread_id, 'Email Date': date_prefix, 'Subject': subject, 'Entity': msg_id, 'Status': "Error", 'Details': str(e)})
+            failed_thread_ids.add(thread_id)
+            report_row.update({'Attachment Count': 'N/A', 'EML File Path': 'N/A'})
+            return report_row
+
+        eml_save_result = save_email_as_eml(msg_id, raw, self.output_dir, email_date, date_prefix=date_prefix)
+        if eml_save_result['status'] == 'Error':
+            failed_thread_ids.add(thread_id)
+        report_row['EML File Path'] = eml_save_result['details'] if eml_save_result['status'] == 'Saved' else 'N/A'
+
+        attachments = _raw_attachments(raw)
+        del raw
+        report_row['Attachment Count'] = len(attachments)
+
+        skipped_rows = []
+        for filename, data in attachments:
+            digest = _attachment_digest(msg_id, filename)
+            if self._already_saved(digest):
+                skipped_rows.append({'Event Type': "Attachment Process", 'Thread ID': thread_id, 'Email Date': date_prefix, 'Subject': subject, 'Entity': filename, 'Status': "Skipped", 'Details': "Already downloaded"})
+                continue
+            save = functools.partial(save_attachment, filename, data, self.output_dir, email_date, date_prefix=date_prefix)
+            self._attachment_task(save, thread_id, filename, date_prefix, subject, digest, failed_thread_ids)
+        self.audit_logger.log_many(skipped_rows)
+        return report_row
+
+    def _finish_chunk(self, chunk, pending_tasks, report_tasks, failed_thread_ids, mark_processed):
+        """
+        Waits for a chunk's downloads and report emails, writes its report rows and marks its threads as processed.
+        pending_tasks holds (thread ID, future) pairs; a task that raised is logged and fails its thread.
+        report_tasks are the futures of the report rows, in message order.
+        """
+        wait(future for _, future in pending_tasks)
+        for thread_id, future in pending_tasks:
+            error = future.exception()
+            if error is not None:
+                self.audit_logger.log({'Event Type': "Worker Task", 'Thread ID': thread_id, 'Status': "Error", 'Details': str(error)})
+                failed_thread_ids.add(thread_id)
+
+        if report_tasks:
+            self.report_logger.log_many(future.result() for future in report_tasks if future.exception() is None)
+
+        # Threads with a failed fetch are left out of the index so the next run retries them
+        if mark_processed:
+            self.processed_index.add(t['id'] for t in chunk if t['id'] not in failed_thread_ids)
 
     def _show_progress(self, iteration, total, status_message=''):
-        """Displays a progress bar with a generic status message."""
+        """
+        Displays a progress bar with a generic status message.
+        Redraws are limited to about 20 per second; the final state is always drawn.
+        """
+        if not total:
+            return
+        now = time.monotonic()
+        if iteration != total and now - self._last_progress_time < PROGRESS_INTERVAL:
+            return
+        self._last_progress_time = now
+
         bar_length = 40
         filled_length = int(bar_length * iteration // total)
         bar = '█' * filled_length + '-' * (bar_length - filled_length)
@@ -91,89 +387,109 @@ class FiscalFetchCore:
 
     def reset_period(self, period_to_reset: str):
         """Deletes files and reports, and removes thread IDs from the index for a specific period."""
-        print(f"--- Starting Reset for period: {period_to_reset} ---")
-        
         try:
-            with open(self.audit_log_path, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                all_rows = list(reader)
-        except FileNotFoundError:
-            print("Audit log not found. Nothing to reset.")
+            self._reset_period(period_to_reset)
+        finally:
+            # Every exit path, including errors, releases the log, the database and the worker pool
             self.audit_logger.close()
-            return
+            self.state_db.close()
+            self.executor.shutdown()
 
-        threads_to_remove = set()
-        files_deleted_count = 0
+    def _reset_period(self, period_to_reset: str):
+        """Does the work of reset_period, which closes everything afterwards."""
+        print(f"--- Starting Reset for period: {period_to_reset} ---")
+        
+        # The downloads table knows which files belong to the period, so the audit log isn't scanned
+        downloads = self.downloads.in_period(period_to_reset)
+        threads_to_remove = {thread_id for thread_id, _ in downloads}
+        file_paths = [os.path.join(self.output_dir, path) for _, path in downloads]
 
-        for row in all_rows:
-            if row['Event Type'] == 'Attachment Process' and row['Status'] == 'Saved':
-                email_date_str = row.get('Email Date', '')
-                
-                if period_to_reset == 'all' or (email_date_str and email_date_str.startswith(period_to_reset)):
-                    file_path = os.path.join(self.output_dir, row['Details'])
-                    if os.path.exists(file_path):
-                        try:
-                            os.remove(file_path)
-                            files_deleted_count += 1
-                            self.audit_logger.log({'Event Type': "File Deletion", 'Thread ID': row['Thread ID'], 'Entity': file_path, 'Status': "Success"})
-                        except OSError as e:
-                            self.audit_logger.log({'Event Type': "File Deletion", 'Thread ID': row['Thread ID'], 'Entity': file_path, 'Status': "Error", 'Details': str(e)})
-                    
-                    threads_to_remove.add(row['Thread ID'])
+        files_deleted_count = 0
+        # Files that could not be deleted stay in the downloads table, so a later reset tries them again
+        removed_downloads = []
+        for download, file_path, (status, details) in zip(downloads, file_paths, self.executor.map(_remove_file, file_paths)):
+            if status != 'Error':
+                removed_downloads.append(download)
+            if status == 'Missing':
+                continue
+            if status == 'Success':
+                files_deleted_count += 1
+            self.audit_logger.log({'Event Type': "File Deletion", 'Thread ID': download[0], 'Entity': file_path, 'Status': status, 'Details': details})
 
         reports_dir = os.path.join(self.output_dir, "reports")
         reports_deleted_count = 0
-        if os.path.exists(reports_dir):
-            for report_filename in os.listdir(reports_dir):
-                if period_to_reset == 'all' or period_to_reset in report_filename:
-                    report_path = os.path.join(reports_dir, report_filename)
-                    try:
-                        os.remove(report_path)
-                        reports_deleted_count += 1
-                        self.audit_logger.log({'Event Type': "Report Deletion", 'Entity': report_path, 'Status': "Success"})
-                    except OSError as e:
-                        self.audit_logger.log({'Event Type': "Report Deletion", 'Entity': report_path, 'Status': "Error", 'Details': str(e)})
+        try:
+            with os.scandir(reports_dir) as entries:
+                for entry in entries:
+                    if period_to_reset == 'all' or period_to_reset in entry.name:
+                        try:
+                            os.remove(entry.path)
+                            reports_deleted_count += 1
+                            self.audit_logger.log({'Event Type': "Report Deletion", 'Entity': entry.path, 'Status': "Success"})
+                        except OSError as e:
+                            self.audit_logger.log({'Event Type': "Report Deletion", 'Entity': entry.path, 'Status': "Error", 'Details': str(e)})
+        except FileNotFoundError:
+            pass
 
         if not threads_to_remove and reports_deleted_count == 0:
             print("No processed files or reports found for the specified period.")
-            self.audit_logger.close()
             return
 
-        processed_thread_ids = self._load_processed_index()
-        updated_thread_ids = processed_thread_ids - threads_to_remove
-        self._save_processed_index(updated_thread_ids)
+        self.processed_index.remove(threads_to_remove)
+        self.saved_attachments.remove_threads(threads_to_remove)
+        self.downloads.remove(removed_downloads)
+        if threads_to_remove:
+            compact_state_db(self.state_db)
 
         print(f"Reset complete. Deleted {files_deleted_count} downloaded files and {reports_deleted_count} reports.")
         print(f"Removed {len(threads_to_remove)} thread IDs from the index.")
         self.audit_logger.log({'Event Type': "Index Reset", 'Status': "Success", 'Details': f"Removed {len(threads_to_remove)} threads for period '{period_to_reset}'."})
-        self.audit_logger.close()
+
+    def _ensure_service(self):
+        """Connects to Gmail on first use. Returns False if no connection could be made."""
+        if self.service is None:
+            self.service, self.user_email = get_gmail_service()
+        return self.service is not None
 
     def run(self):
-        if not self.service:
+        try:
+            self._run()
+        finally:
+            # Every exit path, including errors, stops the worker pool before the logs and the database it writes to are closed
+            self.executor.shutdown(cancel_futures=True)
+            self.audit_logger.close()
+            if self.report_logger: self.report_logger.close()
+            self.state_db.close()
+
+    def _run(self):
+        """Does the work of run, which closes everything afterwards."""
+        if not self._ensure_service():
             print("Could not connect to Gmail. Aborting.")
             return
 
+        # Run options are read once here rather than inside the per-message loop
+        dry_run = bool(self.config.get('dry_run'))
+        force_rescan = bool(self.config.get('force_rescan'))
+        report_logger = self.report_logger
+
         print("\n--- Starting Fiscal Fetch ---")
-        self.audit_logger.log({'Event Type': "Run Start", 'Status': "Success", 'Details': f"Profile: {self.config.get('profile')}, Date Range: {self.config.get('date_range')}"})
+        self.audit_logger.log({'Event Type': "Run Start", 'Status': "Success", 'Details': f"Profile: {self.config.get('profile')}, Date Range: {self.config.get('date_range')}"}, flush=True)
         
-        processed_thread_ids = set()
-        if not self.config.get('force_rescan'):
-            processed_thread_ids = self._load_processed_index()
-
         profile_data = load_profile(self.config.get('profile'))
         query = build_query(profile_data, self.config.get('date_range'), self.user_email)
         
         print("Searching for conversation threads...")
-        results = self.service.users().threads().list(userId='me', q=query).execute()
-        threads = results.get('threads', [])
+        threads = list(self._iter_threads(query))
 
         if not threads:
             print("No conversation threads found.")
             self.audit_logger.log({'Event Type': "Run End", 'Status': "Success", 'Details': "No threads found."})
-            self.audit_logger.close()
-            if self.report_logger: self.report_logger.close()
             return
         
+        processed_thread_ids = set()
+        if not force_rescan:
+            processed_thread_ids = self.processed_index
+
         new_threads_to_process = [t for t in threads if t['id'] not in processed_thread_ids]
         total_threads = len(new_threads_to_process)
         
@@ -182,77 +498,119 @@ class FiscalFetchCore:
         processed_attachment_ids_this_run = set()
         self._show_progress(0, total_threads, "Initializing...")
 
-        for i, thread_info in enumerate(new_threads_to_process):
-            thread = self.service.users().threads().get(userId='me', id=thread_info['id'], format='full').execute()
-            
-            for msg in thread['messages']:
-                subject = next((h['value'] for h in msg['payload']['headers'] if h['name'].lower() == 'subject'), 'No Subject')
-                self._show_progress(i + 1, total_threads, subject)
-
-                timestamp_ms = int(msg['internalDate'])
-                email_date = datetime.fromtimestamp(timestamp_ms / 1000)
-
-                attachment_count = 0
-                if 'parts' in msg['payload']:
-                    attachment_count = sum(1 for part in msg['payload']['parts'] if part.get('filename'))
-
-                if self.report_logger:
-                    raw_msg = self.service.users().messages().get(userId='me', id=msg['id'], format='raw').execute()
-                    raw_data = raw_msg['raw']
-                    sender = next((h['value'] for h in msg['payload']['headers'] if h['name'].lower() == 'from'), 'No Sender')
-                    to_recipients = next((h['value'] for h in msg['payload']['headers'] if h['name'].lower() == 'to'), '')
-                    cc_recipients = next((h['value'] for h in msg['payload']['headers'] if h['name'].lower() == 'cc'), '')
-                    
-                    eml_save_result = save_email_as_eml(msg['id'], raw_data, self.output_dir, email_date)
-                    
-                    self.report_logger.log({
-                        'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        'Thread ID': msg['threadId'],
-                        'Message ID': msg['id'],
-                        'Received Date': email_date.strftime('%Y-%m-%d'),
-                        'Sender': sender,
-                        'To': to_recipients,
-                        'Cc': cc_recipients,
-                        'Subject': subject,
-                        'Attachment Count': attachment_count,
-                        'EML File Path': eml_save_result['details'] if eml_save_result['status'] == 'Saved' else 'N/A'
-                    })
-
-                if 'parts' in msg['payload']:
-                    for part in msg['payload']['parts']:
-                        attachment_id = part.get('body', {}).get('attachmentId')
+        previous_chunk = None
+        for start in range(0, total_threads, BATCH_SIZE):
+            chunk = new_threads_to_process[start:start + BATCH_SIZE]
+            fetched_threads = self._batch_execute({
+                thread_info['id']: self.service.users().threads().get(
+                    userId='me', id=thread_info['id'], format='metadata', metadataHeaders=METADATA_HEADERS,
+                    fields=THREAD_FIELDS
+                )
+                for thread_info in chunk
+            })
+            # With a report on, attachments come out of each raw email instead, so the parts aren't fetched
+            full_messages = {} if report_logger else self._batch_execute({
+                msg['id']: self.service.users().messages().get(
+                    userId='me', id=msg['id'], format='full', fields=MESSAGE_PARTS_FIELDS
+                )
+                for thread in fetched_threads.values() if not isinstance(thread, Exception)
+                for msg in thread['messages'] if _may_have_attachments(msg)
+            })
+            # Attachment downloads and report emails are submitted to the pool while walking the payloads
+            pending_tasks = []
+            report_tasks = []
+            failed_thread_ids = set()
+
+            for i, thread_info in enumerate(chunk, start=start):
+                thread = fetched_threads.get(thread_info['id'])
+                if isinstance(thread, Exception):
+                    self.audit_logger.log({'Event Type': "Thread Fetch", 'Thread ID': thread_info['id'], 'Status': "Error", 'Details': str(thread)})
+                    failed_thread_ids.add(thread_info['id'])
+                    self._show_progress(i + 1, total_threads, "Thread fetch failed")
+                    continue
+
+                # Without a report, a thread with no message that can carry attachments only needs to be marked as processed
+                if not report_logger and not any(msg['id'] in full_messages for msg in thread['messages']):
+                    self._show_progress(i + 1, total_threads, "No attachments")
+                    continue
+
+                for msg in thread['messages']:
+                    headers = _headers(msg)
+                    subject = headers.get('subject', 'No Subject')
+                    self._show_progress(i + 1, total_threads, subject)
+
+                    timestamp_ms = int(msg['internalDate'])
+                    email_date = datetime.fromtimestamp(timestamp_ms / 1000)
+                    # Formatted once per message for the logs and the saved file names
+                    date_prefix = f"{email_date.year:04d}-{email_date.month:02d}-{email_date.day:02d}"
+
+                    if report_logger:
+                        sender = headers.get('from', 'No Sender')
+                        to_recipients = headers.get('to', '')
+                        cc_recipients = headers.get('cc', '')
+                        
+                        report_row = {
+                            'Thread ID': msg['threadId'],
+                            'Message ID': msg['id'],
+                            'Received Date': date_prefix,
+                            'Sender': sender,
+                            'To': to_recipients,
+                            'Cc': cc_recipients,
+                            'Subject': subject
+                        }
+                        future = self.executor.submit(
+                            self._report_task, report_row, thread_info['id'], msg['id'], email_date, date_prefix, subject, failed_thread_ids
+                        )
+                        pending_tasks.append((thread_info['id'], future))
+                        report_tasks.append(future)
+                        continue
+
+                    parts = []
+                    full_msg = full_messages.get(msg['id'])
+                    if isinstance(full_msg, Exception):
+                        self.audit_logger.log({'Event Type': "Message Fetch", 'Thread ID': thread_info['id'], 'Email Date': date_prefix, 'Subject': subject, 'Entity': msg['id'], 'Status': "Error", 'Details': str(full_msg)})
+                        failed_thread_ids.add(thread_info['id'])
+                    elif full_msg:
+                        parts = full_msg.get('payload', {}).get('parts', [])
+
+                    # Rows decided here, without a download, are written together once the message is done
+                    skipped_rows = []
+                    for part in parts:
+                        body = part.get('body', {})
+                        attachment_id = body.get('attachmentId')
+                        # Small attachments can come inline in the message, and then need no separate download
+                        inline_data = body.get('data')
                         filename = part.get('filename')
-                        if filename and attachment_id and attachment_id not in processed_attachment_ids_this_run:
-                            processed_attachment_ids_this_run.add(attachment_id)
+                        run_key = attachment_id or (msg['id'], filename)
+                        if filename and (attachment_id or inline_data) and run_key not in processed_attachment_ids_this_run:
+                            processed_attachment_ids_this_run.add(run_key)
                             
-                            if self.config.get('dry_run'):
-                                self.audit_logger.log({'Event Type': "Attachment Process", 'Thread ID': thread_info['id'], 'Email Date': email_date.strftime('%Y-%m-%d'), 'Subject': subject, 'Entity': filename, 'Status': "Skipped", 'Details': "Dry Run"})
+                            if dry_run:
+                                skipped_rows.append({'Event Type': "Attachment Process", 'Thread ID': thread_info['id'], 'Email Date': date_prefix, 'Subject': subject, 'Entity': filename, 'Status': "Skipped", 'Details': "Dry Run"})
                                 continue
 
-                            attachment_data = self.service.users().messages().attachments().get(
-                                userId='me', messageId=msg['id'], id=attachment_id
-                            ).execute()
+                            digest = _attachment_digest(msg['id'], filename)
+                            if self._already_saved(digest):
+                                skipped_rows.append({'Event Type': "Attachment Process", 'Thread ID': thread_info['id'], 'Email Date': date_prefix, 'Subject': subject, 'Entity': filename, 'Status': "Skipped", 'Details': "Already downloaded"})
+                                continue
 
-                            result = save_attachment(filename, attachment_data['data'], self.output_dir, email_date)
-                            
-                            self.audit_logger.log({
-                                'Event Type': "Attachment Process", 
-                                'Thread ID': thread_info['id'], 
-                                'Email Date': email_date.strftime('%Y-%m-%d'),
-                                'Subject': subject, 
-                                'Entity': filename, 
-                                'Status': result['status'], 
-                                'Details': result['details']
-                            })
-
-            if not self.config.get('dry_run'):
-                processed_thread_ids.add(thread_info['id'])
-
-        if not self.config.get('force_rescan'):
-            self._save_processed_index(processed_thread_ids)
+                            if inline_data:
+                                save = functools.partial(save_attachment, filename, inline_data, self.output_dir, email_date, date_prefix=date_prefix)
+                            else:
+                                save = functools.partial(self._fetch_and_save, msg['id'], attachment_id, filename, email_date, date_prefix)
+                            pending_tasks.append((thread_info['id'], self.executor.submit(
+                                self._attachment_task, save, thread_info['id'], filename, date_prefix, subject, digest, failed_thread_ids
+                            )))
+                    self.audit_logger.log_many(skipped_rows)
+
+            # The previous chunk's downloads kept running while this chunk was fetched; wait for them only now
+            if previous_chunk:
+                self._finish_chunk(*previous_chunk, mark_processed=not dry_run and not force_rescan)
+            previous_chunk = (chunk, pending_tasks, report_tasks, failed_thread_ids)
+
+        if previous_chunk:
+            self._finish_chunk(*previous_chunk, mark_processed=not dry_run and not force_rescan)
 
         print("\n\n--- Fiscal Fetch Finished ---")
         print(f"See reports and downloads in the '{self.output_dir}' directory.")
         self.audit_logger.log({'Event Type': "Run End", 'Status': "Success", 'Details': f"Processed {total_threads} new threads."})
-        self.audit_logger.close()
-        if self.report_logger: self.report_logger.close()
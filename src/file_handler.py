@@ -3,11 +3,65 @@ import os
 import base64
 from datetime import datetime
 
-ALLOWED_EXTENSIONS = ['.pdf', '.docx', '.doc', '.csv', '.zip', '.eml']
+ALLOWED_EXTENSIONS = frozenset({'.pdf', '.docx', '.doc', '.csv', '.zip', '.eml'})
 
-def save_attachment(filename: str, data: str, output_dir: str, email_date: datetime) -> dict:
+# Base64 data is decoded in slices of this many characters (a multiple of 4) to keep peak memory low
+DECODE_CHUNK_SIZE = 64 * 1024
+
+# Creating with O_EXCL checks for an existing file and creates the new one in a single call
+_CREATE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+
+# Directories already created during this process, so repeated saves into the same month skip the mkdir call
+_ENSURED_DIRS: set[str] = set()
+
+class _SafeFilenameTable(dict):
+    """
+    str.translate table that keeps alphanumerics and '._-' and drops everything else.
+    Each code point is classified on first use and cached, so sanitizing runs in C afterwards.
+    """
+    def __missing__(self, codepoint: int):
+        char = chr(codepoint)
+        value = codepoint if char.isalnum() or char in '._-' else None
+        self[codepoint] = value
+        return value
+
+_SAFE_FILENAME_TABLE = _SafeFilenameTable()
+
+def _ensure_dir(path: str):
+    if path in _ENSURED_DIRS:
+        return
+    os.makedirs(path, exist_ok=True)
+    _ENSURED_DIRS.add(path)
+
+def _decode_base64(data: str):
+    """Yields urlsafe base64 data decoded one slice at a time; urlsafe_b64decode accepts the ASCII str slices directly."""
+    for start in range(0, len(data), DECODE_CHUNK_SIZE):
+        yield base64.urlsafe_b64decode(data[start:start + DECODE_CHUNK_SIZE])
+
+def _write_file(file_path: str, chunks):
+    """
+    Writes chunks of bytes straight to a new file's descriptor.
+    Raises FileExistsError if the file already exists; a partially written file is removed if writing fails.
+    """
+    fd = os.open(file_path, _CREATE_FLAGS, 0o644)
+    try:
+        try:
+            for chunk in chunks:
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+    except Exception:
+        os.remove(file_path)
+        raise
+
+def save_attachment(filename: str, data: str | bytes, output_dir: str, email_date: datetime, date_prefix: str | None = None) -> dict:
     """
     Decodes and saves an attachment into a structured directory.
+    data is the urlsafe base64 text Gmail returns, or the already decoded bytes.
+    When the file ends up on disk, whether saved now or already there, 'path' holds its relative path.
+    Callers that already have the date as YYYY-MM-DD can pass it as date_prefix.
     """
     file_ext = os.path.splitext(filename)[1].lower()
     if file_ext not in ALLOWED_EXTENSIONS:
@@ -15,51 +69,47 @@ def save_attachment(filename: str, data: str, output_dir: str, email_date: datet
 
     # Create a dedicated "attachments" subfolder
     structured_dir = os.path.join(output_dir, "downloads", str(email_date.year), f"{email_date.month:02d}", "attachments")
-    if not os.path.exists(structured_dir):
-        os.makedirs(structured_dir)
+    _ensure_dir(structured_dir)
 
-    safe_filename = "".join(c for c in filename if c.isalnum() or c in ('.', '_', '-')).strip()
+    safe_filename = filename.translate(_SAFE_FILENAME_TABLE).strip()
     if not safe_filename:
         safe_filename = f"unnamed_attachment{file_ext}"
     
-    date_prefix = email_date.strftime('%Y-%m-%d')
+    if date_prefix is None:
+        date_prefix = email_date.strftime('%Y-%m-%d')
     unique_filename = f"{date_prefix}_{safe_filename}"
     
     file_path = os.path.join(structured_dir, unique_filename)
-
-    if os.path.exists(file_path):
-        return {'status': 'Skipped', 'details': 'File already exists'}
+    relative_path = os.path.relpath(file_path, output_dir)
 
     try:
-        decoded_data = base64.urlsafe_b64decode(data.encode('UTF-8'))
-        with open(file_path, 'wb') as f:
-            f.write(decoded_data)
-        relative_path = os.path.relpath(file_path, output_dir)
-        return {'status': 'Saved', 'details': relative_path}
+        _write_file(file_path, (data,) if isinstance(data, bytes) else _decode_base64(data))
+        return {'status': 'Saved', 'details': relative_path, 'path': relative_path}
+    except FileExistsError:
+        return {'status': 'Skipped', 'details': 'File already exists', 'path': relative_path}
     except Exception as e:
         return {'status': 'Error', 'details': str(e)}
 
-def save_email_as_eml(message_id: str, data: str, output_dir: str, email_date: datetime) -> dict:
+def save_email_as_eml(message_id: str, data: str, output_dir: str, email_date: datetime, date_prefix: str | None = None) -> dict:
     """
     Saves the raw email content as a .eml file.
+    When the file ends up on disk, whether saved now or already there, 'path' holds its relative path.
+    Callers that already have the date as YYYY-MM-DD can pass it as date_prefix.
     """
     # Create a dedicated "emails" subfolder
     structured_dir = os.path.join(output_dir, "downloads", str(email_date.year), f"{email_date.month:02d}", "emails")
-    if not os.path.exists(structured_dir):
-        os.makedirs(structured_dir)
+    _ensure_dir(structured_dir)
 
-    date_prefix = email_date.strftime('%Y-%m-%d')
+    if date_prefix is None:
+        date_prefix = email_date.strftime('%Y-%m-%d')
     unique_filename = f"{date_prefix}_{message_id}.eml"
     file_path = os.path.join(structured_dir, unique_filename)
-
-    if os.path.exists(file_path):
-        return {'status': 'Skipped', 'details': 'File already exists'}
+    relative_path = os.path.relpath(file_path, output_dir)
 
     try:
-        decoded_data = base64.urlsafe_b64decode(data.encode('UTF-8'))
-        with open(file_path, 'wb') as f:
-            f.write(decoded_data)
-        relative_path = os.path.relpath(file_path, output_dir)
-        return {'status': 'Saved', 'details': relative_path}
+        _write_file(file_path, _decode_base64(data))
+        return {'status': 'Saved', 'details': relative_path, 'path': relative_path}
+    except FileExistsError:
+        return {'status': 'Skipped', 'details': 'File already exists', 'path': relative_path}
     except Exception as e:
         return {'status': 'Error', 'details': str(e)}
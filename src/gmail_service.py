@@ -1,22 +1,49 @@
 # src/gmail_service.py
 import os.path
-import pickle
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import threading
+
+# The Google client libraries are slow to import, so they are only imported once a connection is actually made
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# Socket timeout in seconds for Gmail API connections
+HTTP_TIMEOUT = 60
+
+_thread_local = threading.local()
+
+def _request_builder(creds):
+    """
+    Returns a requestBuilder that gives every thread its own authorized Http,
+    since httplib2.Http objects must not be shared between threads.
+    Each Http is kept for the life of its thread, so its connection is reused across requests.
+    """
+    import httplib2
+    import google_auth_httplib2
+    from googleapiclient.http import HttpRequest
+
+    def build_request(http, *args, **kwargs):
+        thread_http = getattr(_thread_local, 'http', None)
+        if thread_http is None:
+            thread_http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+            _thread_local.http = thread_http
+        return HttpRequest(thread_http, *args, **kwargs)
+    return build_request
+
 def get_gmail_service():
     """
     Authenticates with the Gmail API and returns a service object and user email.
     """
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+
     creds = None
-    if os.path.exists('token.json'):
+    if os.path.exists('token.json') and os.path.getsize('token.json') > 0:
         try:
-            with open('token.json', 'rb') as token:
-                creds = pickle.load(token)
-        except (pickle.UnpicklingError, EOFError):
+            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+        except ValueError:
+            # Also covers tokens pickled by older versions, which are not valid JSON
             print("Warning: token.json found but is invalid. A new one will be created.")
             creds = None
 
@@ -29,11 +56,13 @@ def get_gmail_service():
                 return None, None
             flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
             creds = flow.run_local_server(port=0)
-        with open('token.json', 'wb') as token:
-            pickle.dump(creds, token)
+        with open('token.json', 'w') as token:
+            token.write(creds.to_json())
 
     try:
-        service = build('gmail', 'v1', credentials=creds)
+        service = build(
+            'gmail', 'v1', credentials=creds, requestBuilder=_request_builder(creds), cache_discovery=False
+        )
         profile = service.users().getProfile(userId='me').execute()
         email_address = profile['emailAddress']
         return service, email_address
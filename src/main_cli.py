@@ -8,6 +8,16 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.core import FiscalFetchCore
 
+def positive_int(value: str) -> int:
+    """argparse type for options that need a whole number of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a whole number")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def main():
     """
     The main entry point for the Fiscal Fetch CLI.
@@ -45,6 +55,12 @@ def main():
         action="store_true",
         help="Ignore the processed threads index and re-scan all emails."
     )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=8,
+        help="The number of attachments to download in parallel."
+    )
 
     # New "reset" argument
     parser.add_argument(
@@ -64,12 +80,11 @@ def main():
 
     args = parser.parse_args()
     config = vars(args)
-    app = FiscalFetchCore(config)
 
     if args.reset:
-        app.reset_period(args.reset)
+        FiscalFetchCore(config).reset_period(args.reset)
     elif args.date_range:
-        app.run()
+        FiscalFetchCore(config).run()
     else:
         parser.print_help()
 
@@ -1,38 +1,69 @@
 # src/profile_manager.py
+import functools
 import json
 import os
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PROFILES_DIR = 'profiles'
+
+def _profile_paths(profile_name: str) -> tuple[str, str]:
+    """Returns the paths of the default profile and of the named profile."""
+    return os.path.join(PROFILES_DIR, 'default.json'), os.path.join(PROFILES_DIR, f"{profile_name}.json")
+
+def _read_json(path: str):
+    data = Path(path).read_bytes()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
 
 def load_profile(profile_name: str) -> dict:
     """
     Loads the specified profile and merges it with the default profile.
+    Parsed profiles are cached until one of their files changes on disk.
 
     Args:
         profile_name: The name of the profile to load (e.g., 'marketing-agency').
 
     Returns:
         A dictionary containing the combined search criteria from the default
-        and specified profiles.
+        and specified profiles, each as a frozenset.
+    """
+    default_profile_path, specific_profile_path = _profile_paths(profile_name)
+    cached_profile = _load_profile_cached(profile_name, _mtime(default_profile_path), _mtime(specific_profile_path))
+    # The values are immutable, so a shallow copy keeps the cached dict itself safe
+    return dict(cached_profile)
+
+@functools.lru_cache(maxsize=32)
+def _load_profile_cached(profile_name: str, default_mtime: float | None, specific_mtime: float | None) -> dict:
+    """
+    Reads and merges the profile files; the modification times only serve as part of the cache key.
+    Values are kept as frozensets, so the cached profile can't be modified by callers.
     """
-    profiles_dir = 'profiles'
-    default_profile_path = os.path.join(profiles_dir, 'default.json')
-    specific_profile_path = os.path.join(profiles_dir, f"{profile_name}.json")
+    default_profile_path, specific_profile_path = _profile_paths(profile_name)
 
     # Start with the default profile
     if os.path.exists(default_profile_path):
-        with open(default_profile_path, 'r') as f:
-            combined_profile = json.load(f)
+        combined_profile = {key: frozenset(values) for key, values in _read_json(default_profile_path).items()}
     else:
         print(f"Warning: Default profile not found at {default_profile_path}")
-        combined_profile = {"include_keywords": [], "from_senders": [], "exclude_keywords": []}
+        combined_profile = {"include_keywords": frozenset(), "from_senders": frozenset(), "exclude_keywords": frozenset()}
 
     # If a specific profile is requested, merge it in
     if profile_name and os.path.exists(specific_profile_path):
-        with open(specific_profile_path, 'r') as f:
-            specific_profile = json.load(f)
-            # Merge lists, avoiding duplicates
-            for key in combined_profile:
-                if key in specific_profile:
-                    combined_profile[key] = list(set(combined_profile[key] + specific_profile[key]))
+        specific_profile = _read_json(specific_profile_path)
+        # Merge as set unions, avoiding duplicates
+        for key in combined_profile:
+            if key in specific_profile:
+                combined_profile[key] = combined_profile[key] | frozenset(specific_profile[key])
     elif profile_name:
         print(f"Warning: Specific profile '{profile_name}' not found at {specific_profile_path}")
 
@@ -52,5 +83,5 @@ if __name__ == '__main__':
         print("\nLoading 'marketing-agency' profile...")
         profile_data = load_profile('marketing-agency')
         print("Loaded Profile Data:")
-        print(json.dumps(profile_data, indent=2))
+        print(json.dumps(profile_data, indent=2, default=sorted))
 
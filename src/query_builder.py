@@ -1,6 +1,9 @@
 # src/query_builder.py
+import functools
 from datetime import date
 
+QUERY_KEYS = ('include_keywords', 'from_senders', 'exclude_keywords')
+
 def parse_date_range(date_range_str: str) -> tuple[str, str] | None:
     """
     Parses a date range string into start and end dates.
@@ -27,13 +30,20 @@ def parse_date_range(date_range_str: str) -> tuple[str, str] | None:
 def build_query(profile_data: dict, date_range: str, user_email: str, user_inclusions: dict = None) -> str:
     """
     Builds a Gmail search query string from profile data and user inputs.
+    Terms are emitted in sorted order, so the same inputs always give the same query.
     """
     if user_inclusions is None:
         user_inclusions = {}
 
-    include_keywords = list(set(profile_data.get('include_keywords', []) + user_inclusions.get('include_keywords', [])))
-    from_senders = list(set(profile_data.get('from_senders', []) + user_inclusions.get('from_senders', [])))
-    exclude_keywords = list(set(profile_data.get('exclude_keywords', []) + user_inclusions.get('exclude_keywords', [])))
+    merged = [frozenset(profile_data.get(key, ())) | frozenset(user_inclusions.get(key, ())) for key in QUERY_KEYS]
+    return _build_query(*merged, date_range, user_email)
+
+@functools.lru_cache(maxsize=32)
+def _build_query(include_keywords: frozenset, from_senders: frozenset, exclude_keywords: frozenset, date_range: str, user_email: str) -> str:
+    """Builds the query string from the merged criteria; all arguments are hashable so results can be cached."""
+    include_keywords = sorted(include_keywords)
+    from_senders = sorted(from_senders)
+    exclude_keywords = sorted(exclude_keywords)
 
     positive_parts = []
     if from_senders:
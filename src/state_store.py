@@ -0,0 +1,140 @@
+# src/state_store.py
+import contextlib
+import os
+import sqlite3
+import threading
+
+# Rows deleted per DELETE ... IN (...) statement; stays under SQLite's default limit of 999 bound parameters
+DELETE_BATCH_SIZE = 500
+
+# The connection is shared with the download worker threads; writes are serialized so their transactions don't interleave
+_WRITE_LOCK = threading.Lock()
+
+def open_state_db(path: str) -> sqlite3.Connection:
+    """
+    Opens the SQLite database holding the run state, creating it if needed.
+    WAL journaling keeps committed data safe if a run is interrupted; with WAL,
+    synchronous=NORMAL only syncs at checkpoints instead of on every commit.
+    The connection may be used from several threads; all writes go through _transaction().
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+@contextlib.contextmanager
+def _transaction(conn: sqlite3.Connection):
+    """Runs the enclosed writes as one transaction, holding the write lock."""
+    with _WRITE_LOCK, conn:
+        yield
+
+def _delete_where_in(conn: sqlite3.Connection, table: str, column: str, values):
+    """Deletes the rows whose column matches any of the values, a batch of values per statement, in a single transaction."""
+    values = list(values)
+    with _transaction(conn):
+        for start in range(0, len(values), DELETE_BATCH_SIZE):
+            batch = values[start:start + DELETE_BATCH_SIZE]
+            conn.execute(f'DELETE FROM {table} WHERE {column} IN ({",".join("?" * len(batch))})', batch)
+
+def compact_state_db(conn: sqlite3.Connection):
+    """Rewrites the database file to release the space left behind by deleted rows."""
+    conn.execute('VACUUM')
+
+class ProcessedIndex:
+    """
+    The set of thread IDs that have already been processed.
+    Membership tests are single indexed lookups, so the history never has to be loaded into memory.
+    """
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        # WITHOUT ROWID stores the rows directly in the primary key's B-tree
+        with _transaction(self.conn):
+            self.conn.execute('CREATE TABLE IF NOT EXISTS processed (tid TEXT PRIMARY KEY) WITHOUT ROWID')
+
+    def __contains__(self, thread_id: str) -> bool:
+        return self.conn.execute('SELECT 1 FROM processed WHERE tid = ?', (thread_id,)).fetchone() is not None
+
+    def add(self, thread_ids):
+        """Marks thread IDs as processed in a single transaction."""
+        with _transaction(self.conn):
+            self.conn.executemany('INSERT OR IGNORE INTO processed (tid) VALUES (?)', ((tid,) for tid in thread_ids))
+
+    def remove(self, thread_ids):
+        """Forgets thread IDs in a single transaction, so they are processed again on the next run."""
+        _delete_where_in(self.conn, 'processed', 'tid', thread_ids)
+
+class SavedAttachments:
+    """
+    Digests of the attachments already saved, with the thread each came from and the file's relative path.
+    Lets a rescan skip downloading an attachment that an earlier run saved, as long as its file is still there.
+    """
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        with _transaction(self.conn):
+            self.conn.execute('CREATE TABLE IF NOT EXISTS attachments (digest BLOB PRIMARY KEY, tid TEXT NOT NULL, path TEXT NOT NULL) WITHOUT ROWID')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS attachments_tid ON attachments (tid)')
+
+    def path_of(self, digest: bytes) -> str | None:
+        """Returns the relative path the attachment was saved to, or None if it was never saved."""
+        row = self.conn.execute('SELECT path FROM attachments WHERE digest = ?', (digest,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, entries):
+        """Records (digest, thread ID, relative path) entries in a single transaction."""
+        with _transaction(self.conn):
+            self.conn.executemany('INSERT OR REPLACE INTO attachments (digest, tid, path) VALUES (?, ?, ?)', entries)
+
+    def remove_threads(self, thread_ids):
+        """Forgets every attachment saved from the given threads, so they are downloaded again."""
+        _delete_where_in(self.conn, 'attachments', 'tid', thread_ids)
+
+class Downloads:
+    """
+    The attachment files saved to disk, with the thread and email date each came from.
+    Lets a reset find the files of a period with an indexed query instead of scanning the audit log.
+    """
+    def __init__(self, conn: sqlite3.Connection, existing_entries=None):
+        """
+        existing_entries are (thread ID, email date, relative path) rows from older records. They are only read
+        when the table is created, and if reading them fails the table isn't created, so the next start tries again.
+        """
+        self.conn = conn
+        with _WRITE_LOCK:
+            if self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'downloads'").fetchone():
+                return
+            # Opened explicitly: in its default mode, sqlite3 does not open a transaction before DDL statements
+            self.conn.execute('BEGIN')
+            try:
+                self.conn.execute(
+                    'CREATE TABLE downloads (tid TEXT NOT NULL, email_date TEXT NOT NULL, path TEXT NOT NULL, '
+                    'PRIMARY KEY (tid, path)) WITHOUT ROWID'
+                )
+                self.conn.execute('CREATE INDEX downloads_email_date ON downloads (email_date)')
+                if existing_entries is not None:
+                    self.conn.executemany('INSERT OR IGNORE INTO downloads (tid, email_date, path) VALUES (?, ?, ?)', existing_entries)
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+
+    def add(self, entries):
+        """Records (thread ID, email date, relative path) entries in a single transaction."""
+        with _transaction(self.conn):
+            self.conn.executemany('INSERT OR IGNORE INTO downloads (tid, email_date, path) VALUES (?, ?, ?)', entries)
+
+    def in_period(self, period: str) -> list[tuple[str, str]]:
+        """
+        Returns (thread ID, relative path) for the files whose email date starts with period, or for all files.
+        Dates are stored as YYYY-MM-DD, so a prefix match is a range scan on the email_date index.
+        """
+        if period == 'all':
+            return self.conn.execute('SELECT tid, path FROM downloads').fetchall()
+        return self.conn.execute(
+            'SELECT tid, path FROM downloads WHERE email_date >= ? AND email_date < ?', (period, period + '\uffff')
+        ).fetchall()
+
+    def remove(self, entries):
+        """Forgets (thread ID, relative path) entries in a single transaction."""
+        with _transaction(self.conn):
+            self.conn.executemany('DELETE FROM downloads WHERE tid = ? AND path = ?', entries)